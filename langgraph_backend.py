@@ -8,6 +8,19 @@ from dotenv import load_dotenv
 import sqlite3
 from langchain_google_genai import ChatGoogleGenerativeAI
 import os
+
+# Cache responses keyed on (model, temperature, messages) so repeated
+# histories (regenerate, replayed threads) skip the Gemini call.
+# langchain-community isn't pinned in requirements.txt -- run uncached
+# rather than fail at import when it's absent
+try:
+    from langchain.globals import set_llm_cache
+    from langchain_community.cache import SQLiteCache
+except ImportError:
+    pass
+else:
+    set_llm_cache(SQLiteCache(database_path="llm_cache.db"))
+
 # Initialize Gemini LLM
 llm = ChatGoogleGenerativeAI(
     model="models/gemini-2.0-flash-exp",   # ✅ must include "models/"
@@ -26,9 +39,28 @@ def chat_node(state: ChatState):
     return {"messages": [response]}
 
 conn = sqlite3.connect(database='chatbot.db', check_same_thread=False)
+
+# WAL keeps checkpoint writes from blocking reads; NORMAL sync avoids
+# a full fsync per state update
+for pragma in (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+    "cache_size=-65536",
+    "wal_autocheckpoint=1000",
+):
+    conn.execute(f"PRAGMA {pragma}")
+
 # Checkpointer
 checkpointer = SqliteSaver(conn=conn)
 
+# Index thread_id so the thread list resolves in one B-tree scan
+try:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_thread_id ON checkpoints(thread_id)")
+except sqlite3.OperationalError:
+    pass  # table not created yet
+
 graph = StateGraph(ChatState)
 graph.add_node("chat_node", chat_node)
 graph.add_edge(START, "chat_node")
@@ -37,8 +69,24 @@ graph.add_edge("chat_node", END)
 chatbot = graph.compile(checkpointer=checkpointer)
 
 def retrieve_all_threads():
-    all_threads = set()
-    for checkpoint in checkpointer.list(None):
-        all_threads.add(checkpoint.config['configurable']['thread_id'])
+    try:
+        # Read thread_ids straight off the table -- no checkpoint deserialization
+        cur = conn.execute("SELECT DISTINCT thread_id FROM checkpoints")
+        return [row[0] for row in cur.fetchall()]
+    except sqlite3.OperationalError:
+        # table name differs across langgraph versions -- fall back to the full scan
+        all_threads = {}
+        for checkpoint in checkpointer.list(None):
+            all_threads[checkpoint.config['configurable']['thread_id']] = None
+
+        return list(all_threads)
+
 
-    return list(all_threads)
+if __name__ == "__main__":
+    # Manual smoke test -- kept out of module scope so importing this file
+    # never triggers a live (and billed) Gemini call
+    result = chatbot.invoke(
+        {'messages': [HumanMessage(content="Hello Gemini!")]},
+        config={'configurable': {'thread_id': 'smoke-test'}}
+    )
+    print(result['messages'][-1].content)
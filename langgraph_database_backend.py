@@ -5,37 +5,87 @@ from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
 from dotenv import load_dotenv
+from contextlib import contextmanager
+import queue
 import sqlite3
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import functools
+import hashlib
 import json
+import numpy as np
+import orjson
+import os
+import re
+import shelve
+import time
 
 load_dotenv()
 
+# ================================ LLM CACHE ================================
+
+LLM_TEMPERATURE = 0.7
+
+# Reuse responses for identical (model, temperature, messages) combos so the
+# regenerate button and replayed threads skip the Gemini round-trip entirely.
+# langchain-community isn't pinned in requirements.txt -- run uncached
+# rather than fail at import when it's absent
+try:
+    from langchain.globals import set_llm_cache
+    from langchain_community.cache import SQLiteCache
+except ImportError:
+    pass
+else:
+    set_llm_cache(SQLiteCache(database_path="llm_cache.db"))
+
 # ================================ TOOLS ================================
 
+# Shared HTTP session so TCP+TLS handshakes amortize across tool calls
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=1)
+_session.mount('https://', _adapter)
+_session.mount('http://', _adapter)
+
+# selectolax (lexbor, C) parses HTML far faster than BeautifulSoup's pure-Python
+# parser -- fall back to bs4 when it isn't installed
+try:
+    from selectolax.parser import HTMLParser as LexborParser
+except ImportError:
+    LexborParser = None
+
+# Single-pass whitespace collapse for scraped text
+_WS = re.compile(r'\s+')
+
 @tool
 def web_scraper(url: str) -> str:
     """Scrape and extract text content from a webpage. Use this to read articles, blogs, or documentation."""
     try:
-        from bs4 import BeautifulSoup
-        
         headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Get text
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
+        response = _session.get(url, headers=headers, timeout=10)
+
+        if LexborParser is not None:
+            tree = LexborParser(response.content)
+            for node in tree.css('script, style'):
+                node.decompose()
+            text = tree.text(separator=' ', strip=True)
+        else:
+            from bs4 import BeautifulSoup
+
+            soup = BeautifulSoup(response.content, 'html.parser')
+
+            # Remove script and style elements
+            for script in soup(["script", "style"]):
+                script.decompose()
+
+            # Get text
+            text = soup.get_text()
+
+        text = _WS.sub(' ', text).strip()
+
         # Limit to first 2000 characters
         return text[:2000] + "..." if len(text) > 2000 else text
     except Exception as e:
@@ -46,8 +96,15 @@ def search_wikipedia(query: str) -> str:
     """Search Wikipedia for information on any topic. More reliable than web search for factual information."""
     try:
         url = "https://en.wikipedia.org/api/rest_v1/page/summary/" + query.replace(" ", "_")
-        response = requests.get(url, timeout=5)
-        data = response.json()
+        response = _session.get(url, timeout=5, stream=True)
+
+        # Stream the body in chunks -- orjson decodes the captured bytes much
+        # faster than response.json(). The full body is always read; parsing
+        # a mid-token truncation would fail on every large summary
+        buf = bytearray()
+        for chunk in response.iter_content(4096):
+            buf += chunk
+        data = orjson.loads(bytes(buf))
         
         if 'extract' in data:
             return f"Title: {data['title']}\n\n{data['extract']}\n\nRead more: {data['content_urls']['desktop']['page']}"
@@ -60,8 +117,8 @@ def search_wikipedia(query: str) -> str:
 def analyze_json(json_string: str) -> str:
     """Parse and analyze JSON data. Provides insights like key counts, data types, and structure."""
     try:
-        data = json.loads(json_string)
-        
+        data = orjson.loads(json_string)
+
         def analyze(obj, depth=0):
             if isinstance(obj, dict):
                 return f"Object with {len(obj)} keys: {list(obj.keys())[:5]}"
@@ -71,7 +128,8 @@ def analyze_json(json_string: str) -> str:
                 return f"{type(obj).__name__}: {str(obj)[:50]}"
         
         analysis = analyze(data)
-        return f"JSON Analysis:\n{analysis}\n\nFull structure:\n{json.dumps(data, indent=2)[:500]}"
+        preview = orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()[:500]
+        return f"JSON Analysis:\n{analysis}\n\nFull structure:\n{preview}"
     except Exception as e:
         return f"JSON parsing failed: {str(e)}"
 
@@ -86,7 +144,7 @@ def file_analyzer(file_content: str, file_type: str) -> str:
             return f"CSV Analysis:\n- Rows: {rows}\n- Columns: {cols}\n- Preview:\n{file_content[:200]}"
         
         elif file_type == 'json':
-            data = json.loads(file_content)
+            data = orjson.loads(file_content)
             return analyze_json(file_content)
         
         else:  # text
@@ -97,28 +155,40 @@ def file_analyzer(file_content: str, file_type: str) -> str:
     except Exception as e:
         return f"File analysis failed: {str(e)}"
 
+def _parse_numbers(items):
+    """Parse numeric items into a NumPy array, skipping anything non-numeric."""
+    numbers = []
+    for x in items:
+        try:
+            numbers.append(float(x))
+        except ValueError:
+            pass
+    return np.asarray(numbers)
+
 @tool
 def data_processor(data: str, operation: str) -> str:
     """Process data with operations: sort, filter, aggregate, transform. Input should be comma-separated values."""
     try:
         items = [x.strip() for x in data.split(',')]
-        
+
         if operation == 'sort':
-            try:
-                return ', '.join(sorted(items, key=float))
-            except:
-                return ', '.join(sorted(items))
-        
+            numbers = _parse_numbers(items)
+            if len(numbers) == len(items):
+                # Numeric sort in C; argsort keeps the original string forms
+                return ', '.join(items[i] for i in np.argsort(numbers, kind='stable'))
+            return ', '.join(sorted(items))
+
         elif operation == 'sum':
-            numbers = [float(x) for x in items if x.replace('.','').replace('-','').isdigit()]
-            return f"Sum: {sum(numbers)}"
-        
+            # float() also accepts scientific notation the old isdigit test rejected
+            return f"Sum: {_parse_numbers(items).sum()}"
+
         elif operation == 'average':
-            numbers = [float(x) for x in items if x.replace('.','').replace('-','').isdigit()]
-            return f"Average: {sum(numbers)/len(numbers) if numbers else 0}"
+            numbers = _parse_numbers(items)
+            return f"Average: {numbers.mean() if len(numbers) else 0}"
         
         elif operation == 'unique':
-            return ', '.join(set(items))
+            # dict.fromkeys dedupes in C and keeps first-seen order
+            return ', '.join(dict.fromkeys(items))
         
         elif operation == 'count':
             return f"Count: {len(items)}"
@@ -146,7 +216,7 @@ def create_chart_data(data_description: str) -> str:
         else:
             result = {'type': 'data', 'message': 'Specify chart type: bar or line'}
         
-        return json.dumps(result, indent=2)
+        return orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
     except Exception as e:
         return f"Chart generation failed: {str(e)}"
 
@@ -155,29 +225,34 @@ def api_caller(url: str, method: str = "GET") -> str:
     """Call any public API and return the response. Supports GET requests."""
     try:
         if method.upper() == "GET":
-            response = requests.get(url, timeout=10)
+            response = _session.get(url, timeout=10)
             return f"Status: {response.status_code}\n\nResponse:\n{response.text[:1000]}"
         else:
             return "Only GET method is supported for safety reasons."
     except Exception as e:
         return f"API call failed: {str(e)}"
 
+# Sentiment word lists for text_analyzer -- frozensets for O(1) membership
+POSITIVE_WORDS = frozenset({'good', 'great', 'excellent', 'happy', 'love', 'amazing', 'wonderful'})
+NEGATIVE_WORDS = frozenset({'bad', 'terrible', 'awful', 'hate', 'poor', 'worst', 'horrible'})
+
 @tool
 def text_analyzer(text: str) -> str:
     """Analyze text for sentiment, word frequency, and readability metrics."""
     try:
-        words = text.lower().split()
-        word_count = len(words)
-        unique_words = len(set(words))
-        avg_word_length = sum(len(w) for w in words) / word_count if word_count > 0 else 0
-        
+        from collections import Counter
+
+        # One pass over the words; everything else works off the counts
+        counts = Counter(text.lower().split())
+        word_count = sum(counts.values())
+        unique_words = len(counts)
+        total_length = sum(len(w) * n for w, n in counts.items())
+        avg_word_length = total_length / word_count if word_count > 0 else 0
+
         # Simple sentiment analysis
-        positive_words = ['good', 'great', 'excellent', 'happy', 'love', 'amazing', 'wonderful']
-        negative_words = ['bad', 'terrible', 'awful', 'hate', 'poor', 'worst', 'horrible']
-        
-        pos_count = sum(1 for w in words if w in positive_words)
-        neg_count = sum(1 for w in words if w in negative_words)
-        
+        pos_count = sum(n for w, n in counts.items() if w in POSITIVE_WORDS)
+        neg_count = sum(n for w, n in counts.items() if w in NEGATIVE_WORDS)
+
         sentiment = "Positive" if pos_count > neg_count else "Negative" if neg_count > pos_count else "Neutral"
         
         return f"""Text Analysis:
@@ -189,13 +264,16 @@ def text_analyzer(text: str) -> str:
     except Exception as e:
         return f"Text analysis failed: {str(e)}"
 
+@functools.lru_cache(maxsize=256)
+def _compile_pattern(pattern):
+    """Compile a regex once and reuse it -- the tool sees the same patterns repeatedly."""
+    return re.compile(pattern)
+
 @tool
 def regex_matcher(text: str, pattern: str) -> str:
     """Find patterns in text using regex. Extract emails, phone numbers, URLs, etc."""
     try:
-        import re
-        
-        matches = re.findall(pattern, text)
+        matches = _compile_pattern(pattern).findall(text)
         
         if matches:
             return f"Found {len(matches)} matches:\n" + "\n".join(str(m) for m in matches[:20])
@@ -272,7 +350,7 @@ tools = [
 # Initialize Gemini LLM with tools
 llm = ChatGoogleGenerativeAI(
     model="models/gemini-2.0-flash-exp",
-    temperature=0.7,
+    temperature=LLM_TEMPERATURE,
 )
 
 # Bind tools to LLM
@@ -305,18 +383,137 @@ def should_continue(state: AgentState) -> Literal["tools", "end"]:
 # Create tool node
 tool_node = ToolNode(tools)
 
+# Second cache level (action -> outputs): repeated tool calls with identical
+# arguments are served from disk instead of re-running the tool.
+TOOL_CACHE_PATH = "tool_cache"
+
+# Tools whose output depends on when they run, not just on their arguments
+UNCACHEABLE_TOOLS = {"get_current_time", "create_chart_data", "api_caller", "python_code_executor"}
+
+def _tool_cache_key(tool_call):
+    """Stable hash for a tool call: name + sorted args."""
+    payload = tool_call.get('name', '') + json.dumps(tool_call.get('args', {}), sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+_tools_by_name = {t.name: t for t in tools}
+_tool_executor = ThreadPoolExecutor(max_workers=8)
+
+def _run_tool_call(tool_call):
+    """Execute a single tool call and return its string result."""
+    selected_tool = _tools_by_name.get(tool_call.get('name'))
+    if selected_tool is None:
+        return f"Unknown tool: {tool_call.get('name')}"
+    try:
+        result = selected_tool.invoke(tool_call.get('args', {}))
+    except Exception as e:
+        return f"Tool {tool_call.get('name')} failed: {str(e)}"
+    return result if isinstance(result, str) else json.dumps(result)
+
+def cached_tool_node(state: AgentState):
+    """Run tool calls concurrently, serving repeats from the persistent cache."""
+    last_message = state['messages'][-1]
+    tool_calls = getattr(last_message, 'tool_calls', None) or []
+    if not tool_calls:
+        return tool_node.invoke(state)
+
+    try:
+        with shelve.open(TOOL_CACHE_PATH) as cache:
+            contents = {}
+            misses = []
+            for tc in tool_calls:
+                key = _tool_cache_key(tc)
+                if tc.get('name') not in UNCACHEABLE_TOOLS and key in cache:
+                    contents[tc['id']] = cache[key]
+                else:
+                    misses.append(tc)
+
+            # Misses run in parallel: multi-tool turns cost max(Ti), not sum(Ti)
+            if misses:
+                for tc, content in zip(misses, _tool_executor.map(_run_tool_call, misses)):
+                    contents[tc['id']] = content
+                    if tc.get('name') not in UNCACHEABLE_TOOLS:
+                        cache[_tool_cache_key(tc)] = content
+
+            return {"messages": [
+                ToolMessage(content=contents[tc['id']], name=tc['name'], tool_call_id=tc['id'])
+                for tc in tool_calls
+            ]}
+    except Exception:
+        # Cache trouble should never break the agent loop
+        return tool_node.invoke(state)
+
 # ================================ GRAPH SETUP ================================
 
 # Create SQLite connection and checkpointer
 conn = sqlite3.connect(database='chatbot.db', check_same_thread=False)
+
+# WAL keeps checkpoint writes from blocking sidebar reads; NORMAL sync avoids
+# a full fsync per state update
+for pragma in (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+    "cache_size=-65536",
+    "wal_autocheckpoint=1000",
+):
+    conn.execute(f"PRAGMA {pragma}")
+
 checkpointer = SqliteSaver(conn=conn)
 
+# Index thread_id so the thread list resolves in one B-tree scan
+try:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_thread_id ON checkpoints(thread_id)")
+except sqlite3.OperationalError:
+    pass  # table not created yet
+
+# Full-text index over chat messages so sidebar search runs in SQL instead of
+# scanning every deserialized conversation in Python
+# Pool of read connections: sidebar queries (thread list, search, summaries)
+# borrow one instead of contending with the checkpointer's writer connection.
+# WAL mode lets these readers run while a checkpoint write is in flight.
+_READ_POOL_SIZE = 4
+_read_pool = queue.Queue(maxsize=_READ_POOL_SIZE)
+for _ in range(_READ_POOL_SIZE):
+    _rconn = sqlite3.connect(database='chatbot.db', check_same_thread=False)
+    for pragma in ("journal_mode=WAL", "synchronous=NORMAL", "temp_store=MEMORY"):
+        _rconn.execute(f"PRAGMA {pragma}")
+    _read_pool.put(_rconn)
+
+@contextmanager
+def _read_conn():
+    """Borrow a pooled read connection; writes stay on the checkpointer's conn."""
+    rconn = _read_pool.get()
+    try:
+        yield rconn
+    finally:
+        _read_pool.put(rconn)
+
+try:
+    conn.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts "
+        "USING fts5(thread_id UNINDEXED, role UNINDEXED, content, "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    FTS_AVAILABLE = True
+except sqlite3.OperationalError:
+    FTS_AVAILABLE = False
+
+# Last-activity timestamps drive archive rotation of idle threads
+try:
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS thread_activity "
+        "(thread_id TEXT PRIMARY KEY, last_updated REAL)"
+    )
+except sqlite3.OperationalError:
+    pass
+
 # Build the graph
 graph = StateGraph(AgentState)
 
 # Add nodes
 graph.add_node("agent", agent_node)
-graph.add_node("tools", tool_node)
+graph.add_node("tools", cached_tool_node)
 
 # Add edges
 graph.add_edge(START, "agent")
@@ -337,17 +534,247 @@ chatbot = graph.compile(checkpointer=checkpointer)
 
 def retrieve_all_threads():
     """Retrieve all unique thread IDs from the database."""
-    all_threads = set()
+    try:
+        # Read thread_ids straight off the table -- no checkpoint deserialization
+        with _read_conn() as rconn:
+            cur = rconn.execute("SELECT DISTINCT thread_id FROM checkpoints")
+            return [row[0] for row in cur.fetchall()]
+    except sqlite3.OperationalError:
+        # table name differs across langgraph versions -- fall back to the full scan
+        pass
+
+    all_threads = {}
     try:
         for checkpoint in checkpointer.list(None):
             thread_id = checkpoint.config.get('configurable', {}).get('thread_id')
             if thread_id:
-                all_threads.add(thread_id)
+                all_threads[thread_id] = None
     except Exception as e:
         print(f"Error retrieving threads: {e}")
-    
+
     return list(all_threads)
 
+def index_message(thread_id, role, content):
+    """Add one chat message to the full-text search index."""
+    if not FTS_AVAILABLE or not content:
+        return
+    try:
+        conn.execute(
+            "INSERT INTO messages_fts (thread_id, role, content) VALUES (?, ?, ?)",
+            (str(thread_id), role, content)
+        )
+        conn.execute(
+            "INSERT INTO thread_activity (thread_id, last_updated) VALUES (?, ?) "
+            "ON CONFLICT(thread_id) DO UPDATE SET last_updated=excluded.last_updated",
+            (str(thread_id), time.time())
+        )
+        conn.commit()
+    except sqlite3.Error:
+        pass  # search indexing must never break the chat flow
+
+def _backfill_fts_index():
+    """One-time population of messages_fts from pre-existing checkpoints.
+
+    The index fills incrementally as new turns land; without this, every
+    conversation created before the index existed would be invisible to
+    search, since an empty FTS result set never triggers the Python-scan
+    fallback.
+    """
+    if not FTS_AVAILABLE:
+        return
+    try:
+        if conn.execute("SELECT count(*) FROM messages_fts").fetchone()[0]:
+            return  # already populated (or incrementally built)
+    except sqlite3.Error:
+        return
+    for thread_id in retrieve_all_threads():
+        try:
+            state = chatbot.get_state(config={'configurable': {'thread_id': thread_id}})
+            messages = state.values.get('messages', [])
+        except Exception:
+            continue
+        for m in messages:
+            if m.type in ('human', 'ai') and isinstance(m.content, str) and m.content:
+                try:
+                    conn.execute(
+                        "INSERT INTO messages_fts (thread_id, role, content) VALUES (?, ?, ?)",
+                        (str(thread_id), 'user' if m.type == 'human' else 'assistant', m.content)
+                    )
+                except sqlite3.Error:
+                    pass
+    conn.commit()
+
+_backfill_fts_index()
+
+def search_messages_fts(query, limit=50):
+    """BM25-ranked full-text search over indexed messages.
+
+    Returns (thread_id, snippet) pairs ordered by relevance, deduped to one
+    row per thread, or None when the FTS index is unavailable so callers can
+    fall back to a Python scan.
+    """
+    if not FTS_AVAILABLE:
+        return None
+    try:
+        # Quote the query so user input is matched literally, not as FTS syntax
+        match = '"' + query.replace('"', '""') + '"'
+        with _read_conn() as rconn:
+            cur = rconn.execute(
+                "SELECT thread_id, snippet(messages_fts, 2, '**', '**', '…', 10) "
+                "FROM messages_fts WHERE messages_fts MATCH ? "
+                "ORDER BY bm25(messages_fts) LIMIT ?",
+                (match, limit)
+            )
+            rows = cur.fetchall()
+    except sqlite3.Error:
+        return None
+
+    results = []
+    seen = set()
+    for thread_id, snippet in rows:
+        if thread_id not in seen:
+            seen.add(thread_id)
+            results.append((thread_id, snippet))
+    return results
+
+ARCHIVE_DIR = "archives"
+ARCHIVE_AFTER_DAYS = 30
+
+def archive_old_threads():
+    """Move threads idle for ARCHIVE_AFTER_DAYS to monthly JSONL files.
+
+    Archived messages come from the checkpointed state -- the source of truth;
+    the FTS index only holds text indexed since the index existed, so reading
+    it here would silently drop the rest. The thread is removed from the live
+    checkpoint tables and the index only after both the archive line is on
+    disk and the checkpoint delete succeeded. Returns the number of threads
+    archived.
+    """
+    if not FTS_AVAILABLE:
+        return 0
+    # Without delete_thread every run would re-append the same stale threads
+    if not hasattr(checkpointer, 'delete_thread'):
+        return 0
+    cutoff = time.time() - ARCHIVE_AFTER_DAYS * 86400
+    try:
+        cur = conn.execute(
+            "SELECT thread_id, last_updated FROM thread_activity WHERE last_updated < ?",
+            (cutoff,)
+        )
+        stale = cur.fetchall()
+    except sqlite3.Error:
+        return 0
+    if not stale:
+        return 0
+
+    role_names = {'human': 'user', 'ai': 'assistant'}
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    archived = 0
+    for thread_id, last_updated in stale:
+        try:
+            state = chatbot.get_state(config={'configurable': {'thread_id': thread_id}})
+            messages = state.values.get('messages', [])
+        except Exception:
+            continue
+
+        try:
+            month = datetime.fromtimestamp(last_updated).strftime('%Y-%m')
+            with open(os.path.join(ARCHIVE_DIR, f"{month}.jsonl"), 'ab') as f:
+                f.write(orjson.dumps({
+                    'thread_id': thread_id,
+                    'last_updated': last_updated,
+                    'messages': [{
+                        'role': role_names.get(m.type, m.type),
+                        'content': m.content if isinstance(m.content, str) else str(m.content)
+                    } for m in messages]
+                }) + b"\n")
+
+            # Only drop the live rows once the archive line is on disk, and
+            # only drop the index rows once the checkpoint delete succeeded --
+            # otherwise the thread stays live but becomes unsearchable
+            try:
+                checkpointer.delete_thread(thread_id)
+            except Exception:
+                continue
+            conn.execute("DELETE FROM messages_fts WHERE thread_id = ?", (thread_id,))
+            conn.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+            archived += 1
+        except (sqlite3.Error, OSError):
+            continue
+    conn.commit()
+    return archived
+
+def search_archives(query, limit=50):
+    """Substring search across the archived monthly JSONL files."""
+    results = []
+    if not os.path.isdir(ARCHIVE_DIR):
+        return results
+    query_lower = query.lower()
+
+    for name in sorted(os.listdir(ARCHIVE_DIR), reverse=True):
+        if not name.endswith('.jsonl'):
+            continue
+        with open(os.path.join(ARCHIVE_DIR, name), 'rb') as f:
+            for line in f:
+                record = orjson.loads(line)
+                for msg in record['messages']:
+                    if query_lower in msg['content'].lower():
+                        results.append((record['thread_id'], msg['content'][:100]))
+                        break
+                if len(results) >= limit:
+                    return results
+    return results
+
+def get_thread_summaries(thread_ids=None):
+    """Fetch title and message count for many threads in a single query.
+
+    Reads from the messages_fts index instead of the checkpoint rows --
+    checkpoints store opaque serialized blobs, so the search index doubles as
+    the cheap metadata source. Threads not yet indexed are absent from the
+    returned dict; callers fall back to loading those individually.
+    """
+    if not FTS_AVAILABLE:
+        return {}
+    try:
+        with _read_conn() as rconn:
+            cur = rconn.execute(
+                "SELECT m.thread_id, COUNT(*), "
+                "(SELECT content FROM messages_fts f "
+                " WHERE f.thread_id = m.thread_id AND f.role = 'user' "
+                " ORDER BY f.rowid LIMIT 1) "
+                "FROM messages_fts m GROUP BY m.thread_id"
+            )
+            rows = cur.fetchall()
+    except sqlite3.Error:
+        return {}
+
+    wanted = set(str(t) for t in thread_ids) if thread_ids is not None else None
+    summaries = {}
+    for thread_id, count, first_user in rows:
+        if wanted is not None and thread_id not in wanted:
+            continue
+        if first_user:
+            title = first_user[:50] + "..." if len(first_user) > 50 else first_user
+        else:
+            title = "New Chat"
+        summaries[thread_id] = {'title': title, 'message_count': count}
+    return summaries
+
+FILE_CHUNK_SIZE = 4096
+
+def batch_analyze_file(file_content, instruction="Summarize this file chunk."):
+    """Analyze a large file by fanning its 4 KB chunks through llm.batch.
+
+    A single batched request pipelines the per-chunk calls over a shared
+    connection (capped at 5 concurrent), so the whole file costs roughly one
+    round-trip instead of one per chunk. Uses the bare llm -- chunk analysis
+    should not trigger tool-call loops.
+    """
+    chunks = [file_content[i:i + FILE_CHUNK_SIZE] for i in range(0, len(file_content), FILE_CHUNK_SIZE)]
+    batches = [[HumanMessage(content=f"{instruction}\n\n{chunk}")] for chunk in chunks]
+    outputs = llm.batch(batches, config={'max_concurrency': 5})
+    return "\n\n".join(output.content for output in outputs)
+
 def get_available_tools():
     """Return information about available tools."""
     tool_info = []
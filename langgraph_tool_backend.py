@@ -91,8 +91,27 @@ tool_node = ToolNode(tools)
 # 5. Checkpointer
 # -------------------
 conn = sqlite3.connect(database="chatbot.db", check_same_thread=False)
+
+# WAL keeps checkpoint writes from blocking reads; NORMAL sync avoids
+# a full fsync per state update
+for pragma in (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+    "cache_size=-65536",
+    "wal_autocheckpoint=1000",
+):
+    conn.execute(f"PRAGMA {pragma}")
+
 checkpointer = SqliteSaver(conn=conn)
 
+# Index thread_id so the thread list resolves in one B-tree scan
+try:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_thread_id ON checkpoints(thread_id)")
+except sqlite3.OperationalError:
+    pass  # table not created yet
+
 # -------------------
 # 6. Graph
 # -------------------
@@ -111,7 +130,13 @@ chatbot = graph.compile(checkpointer=checkpointer)
 # 7. Helper
 # -------------------
 def retrieve_all_threads():
-    all_threads = set()
-    for checkpoint in checkpointer.list(None):
-        all_threads.add(checkpoint.config["configurable"]["thread_id"])
-    return list(all_threads)
\ No newline at end of file
+    try:
+        # Read thread_ids straight off the table -- no checkpoint deserialization
+        cur = conn.execute("SELECT DISTINCT thread_id FROM checkpoints")
+        return [row[0] for row in cur.fetchall()]
+    except sqlite3.OperationalError:
+        # table name differs across langgraph versions -- fall back to the full scan
+        all_threads = {}
+        for checkpoint in checkpointer.list(None):
+            all_threads[checkpoint.config["configurable"]["thread_id"]] = None
+        return list(all_threads)
\ No newline at end of file
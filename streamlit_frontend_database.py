@@ -1,10 +1,15 @@
 import streamlit as st
-from langgraph_database_backend import chatbot, retrieve_all_threads, get_available_tools
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 import uuid
-import json
+import orjson
+import functools
+import queue
+import re
+import threading
+import time
 from datetime import datetime
 import sqlite3
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 
 # **************************************** Page Config *************************
 st.set_page_config(
@@ -14,110 +19,288 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# **************************************** Backend *************************
+
+@st.cache_resource(show_spinner=False)
+def get_backend():
+    """Import the backend once per process -- the compiled graph, checkpointer
+    and HTTP session survive reruns and are shared across sessions."""
+    from langgraph_database_backend import (
+        chatbot, retrieve_all_threads, get_available_tools,
+        index_message, search_messages_fts, get_thread_summaries,
+        archive_old_threads, search_archives
+    )
+    return (chatbot, retrieve_all_threads, get_available_tools,
+            index_message, search_messages_fts, get_thread_summaries,
+            archive_old_threads, search_archives)
+
+(chatbot, retrieve_all_threads, get_available_tools,
+ index_message, search_messages_fts, get_thread_summaries,
+ archive_old_threads, search_archives) = get_backend()
+
 # **************************************** Utility Functions *************************
 
+# Threads rendered per sidebar page; 'Load more' reveals the next page
+PAGE_SIZE = 20
+
+# Most recent tool outputs kept in memory; older ones are evicted
+TOOL_RESULTS_CAP = 32
+
+# Display grouping for the Available Tools expander
+TOOL_CATEGORIES = {
+    ' Web & Data': ['search_wikipedia', 'web_scraper', 'api_caller'],
+    ' Processing': ['calculate', 'data_processor', 'python_code_executor'],
+    ' Analysis': ['text_analyzer', 'analyze_json', 'file_analyzer', 'regex_matcher'],
+    ' Creation': ['create_chart_data'],
+    ' Utilities': ['get_current_time']
+}
+
+# Seconds before a thread that failed to load is retried
+LOAD_ERROR_COOLDOWN = 30
+
+# Reverse map built once so the expander groups tools in a single pass
+TOOL_TO_CATEGORY = {
+    name: category
+    for category, names in TOOL_CATEGORIES.items()
+    for name in names
+}
+
+def store_tool_results(results):
+    """Park tool output in a capped store and return a reference key.
+
+    message_history carries only the key, so Streamlit's session payload stays
+    small no matter how large scraper/wiki outputs get; the oldest entries are
+    evicted once the cap is hit.
+    """
+    store = st.session_state.setdefault('tool_results_store', {})
+    key = str(uuid.uuid4())
+    store[key] = results
+    while len(store) > TOOL_RESULTS_CAP:
+        store.pop(next(iter(store)))
+    return key
+
 def generate_thread_id():
     """Generate a unique thread ID."""
     return str(uuid.uuid4())
 
+@functools.lru_cache(maxsize=1)
+def _iso_bucket(sec):
+    """ISO timestamp at 1-second granularity, cached between reruns."""
+    return datetime.fromtimestamp(sec).isoformat()
+
+def _now_iso():
+    """Current timestamp; repeated calls within the same second reuse the string."""
+    return _iso_bucket(int(time.time()))
+
+def apply_system_prompt(thread_id):
+    """Seed a fresh thread's checkpointed state with the system prompt.
+
+    Gemini only honors a SystemMessage at the head of history -- update_state
+    appends, so seeding a thread that already has messages is silently
+    dropped. Seeding is therefore limited to empty threads (or re-seeding our
+    own leading message: the stable id makes add_messages replace it in place
+    when the prompt changes). Threads with existing history keep the baseline
+    per-turn prepend -- see the send path.
+    """
+    prompt = st.session_state.get('system_prompt', '')
+    applied = st.session_state.setdefault('_system_prompt_applied', {})
+    if not prompt or applied.get(thread_id) == prompt:
+        return
+    seed_id = f'system-{thread_id}'
+    try:
+        state = chatbot.get_state(config={'configurable': {'thread_id': thread_id}})
+        existing = state.values.get('messages', [])
+    except Exception:
+        return  # state unknown -- the per-turn prepend covers this thread
+    if existing and getattr(existing[0], 'id', None) != seed_id:
+        return
+    try:
+        chatbot.update_state(
+            {'configurable': {'thread_id': thread_id}},
+            {'messages': [SystemMessage(content=prompt, id=seed_id)]}
+        )
+        applied[thread_id] = prompt
+        invalidate_conversation_cache(thread_id)
+    except Exception as e:
+        st.warning(f"Could not apply system prompt: {e}")
+
 def reset_chat():
     """Create a new chat thread."""
     thread_id = generate_thread_id()
     st.session_state['thread_id'] = thread_id
     add_thread(thread_id)
     st.session_state['message_history'] = []
+    invalidate_conversation_cache(thread_id)
     st.session_state['chat_metadata'][thread_id] = {
-        'created_at': datetime.now().isoformat(),
+        'created_at': _now_iso(),
         'title': 'New Chat',
         'message_count': 0
     }
+    # No prompt seeding here: the send path seeds before the first message,
+    # and seeding now would checkpoint every never-used 'New Chat' thread
+    # into retrieve_all_threads() permanently
+
+def touch_thread(thread_id):
+    """Move a thread to the front of the recency ordering."""
+    recent = st.session_state.setdefault('threads_by_recent', [])
+    if recent and recent[0] == thread_id:
+        return
+    if thread_id in recent:
+        recent.remove(thread_id)
+    recent.insert(0, thread_id)
 
 def add_thread(thread_id):
     """Add thread to list if not already present."""
     if thread_id not in st.session_state['chat_threads']:
         st.session_state['chat_threads'].append(thread_id)
+        touch_thread(thread_id)
         if thread_id not in st.session_state['chat_metadata']:
             st.session_state['chat_metadata'][thread_id] = {
-                'created_at': datetime.now().isoformat(),
+                'created_at': _now_iso(),
                 'title': 'New Chat',
                 'message_count': 0
             }
 
+def invalidate_conversation_cache(thread_id):
+    """Bump the thread's version token so the next load bypasses the cached copy."""
+    versions = st.session_state.setdefault('thread_versions', {})
+    versions[thread_id] = versions.get(thread_id, 0) + 1
+
 def load_conversation(thread_id):
-    """Load conversation history for a specific thread."""
+    """Load conversation history for a specific thread.
+
+    Results are cached per (thread_id, version); the version only moves when a
+    new turn lands, the thread is deleted, or its state is reseeded, so steady
+    reruns never touch the checkpoint store.
+    """
+    cache = st.session_state.setdefault('_conv_cache', {})
+    version = st.session_state.setdefault('thread_versions', {}).get(thread_id, 0)
+    cached = cache.get(thread_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    # A corrupt thread would otherwise retry get_state and toast an error on
+    # every rerun for every sidebar row; record the failure and back off
+    errors = st.session_state.setdefault('load_errors', {})
+    failed = errors.get(thread_id)
+    if failed is not None and time.monotonic() - failed['at'] < LOAD_ERROR_COOLDOWN:
+        return []
     try:
         state = chatbot.get_state(config={'configurable': {'thread_id': thread_id}})
-        return state.values.get('messages', [])
+        messages = state.values.get('messages', [])
     except Exception as e:
-        st.error(f"Error loading conversation: {e}")
+        errors[thread_id] = {'error': str(e), 'at': time.monotonic()}
         return []
+    errors.pop(thread_id, None)
+    # Cache the render-ready role/content view alongside the raw messages so
+    # thread-switch handlers don't rebuild it per click
+    view = [
+        {'role': 'user' if m.type == 'human' else 'assistant', 'content': m.content}
+        for m in messages
+    ]
+    cache[thread_id] = (version, messages, view)
+    return messages
+
+def load_conversation_view(thread_id):
+    """Return the cached [{'role', 'content'}] view for a thread."""
+    load_conversation(thread_id)
+    cached = st.session_state.get('_conv_cache', {}).get(thread_id)
+    return cached[2] if cached is not None else []
 
 def format_thread_name(thread_id, messages):
     """Create a readable name for the thread button."""
     if not messages:
         return "New Chat"
     
-    # Get first user message
-    for msg in messages:
-        if isinstance(msg, HumanMessage):
-            preview = msg.content[:50] + "..." if len(msg.content) > 50 else msg.content
-            return preview
-    
+    # Get first user message -- .type is a plain attribute, cheaper than an
+    # isinstance MRO walk per message
+    first_user = next((m.content for m in messages if m.type == 'human'), None)
+    if first_user is not None:
+        return first_user[:50] + "..." if len(first_user) > 50 else first_user
+
     return "Empty Chat"
 
 def delete_thread(thread_id):
     """Delete a thread from the list."""
     if thread_id in st.session_state['chat_threads']:
         st.session_state['chat_threads'].remove(thread_id)
+    if thread_id in st.session_state.get('threads_by_recent', []):
+        st.session_state['threads_by_recent'].remove(thread_id)
     if thread_id in st.session_state['chat_metadata']:
         del st.session_state['chat_metadata'][thread_id]
+    invalidate_conversation_cache(thread_id)
 
 def export_conversation(thread_id):
-    """Export conversation to JSON format."""
-    messages = load_conversation(thread_id)
+    """Export conversation to JSON bytes, ready for st.download_button."""
     export_data = {
         'thread_id': thread_id,
-        'exported_at': datetime.now().isoformat(),
-        'messages': []
-    }
-    
-    for msg in messages:
-        export_data['messages'].append({
-            'role': 'user' if isinstance(msg, HumanMessage) else 'assistant',
+        'exported_at': _now_iso(),
+        'messages': [{
+            'role': 'user' if msg.type == 'human' else 'assistant',
             'content': msg.content,
             'timestamp': getattr(msg, 'timestamp', None)
-        })
-    
-    return json.dumps(export_data, indent=2)
+        } for msg in load_conversation(thread_id)]
+    }
+
+    return orjson.dumps(export_data, option=orjson.OPT_INDENT_2)
 
 def search_conversations(query):
     """Search through all conversations for matching content."""
+    archive_results = []
+    if st.session_state.get('include_archived'):
+        archive_results = [{
+            'thread_id': thread_id,
+            'preview': f'[Archived] {excerpt[:35]}',
+            'match': excerpt
+        } for thread_id, excerpt in search_archives(query)]
+
+    fts_results = search_messages_fts(query)
+    if fts_results is not None:
+        return [{
+            'thread_id': thread_id,
+            'preview': st.session_state['chat_metadata'].get(thread_id, {}).get('title', excerpt),
+            'match': excerpt
+        } for thread_id, excerpt in fts_results] + archive_results
+
+    # FTS index unavailable -- fall back to scanning loaded conversations.
+    # A case-insensitive compiled pattern folds case in the matcher itself,
+    # instead of allocating a lowercased copy of every message
+    pattern = re.compile(re.escape(query), re.IGNORECASE)
     results = []
-    query_lower = query.lower()
-    
+
     for thread_id in st.session_state['chat_threads']:
         messages = load_conversation(thread_id)
         for msg in messages:
-            if query_lower in msg.content.lower():
+            if pattern.search(msg.content):
+                cached_title = st.session_state['chat_metadata'].get(thread_id, {}).get('title')
                 results.append({
                     'thread_id': thread_id,
-                    'preview': format_thread_name(thread_id, messages),
+                    'preview': cached_title or format_thread_name(thread_id, messages),
                     'match': msg.content[:100]
                 })
                 break
-    
-    return results
+
+    return results + archive_results
 
 def update_chat_metadata(thread_id):
     """Update metadata for a chat thread."""
     messages = load_conversation(thread_id)
-    if thread_id not in st.session_state['chat_metadata']:
-        st.session_state['chat_metadata'][thread_id] = {}
-    
-    st.session_state['chat_metadata'][thread_id].update({
+    metadata = st.session_state['chat_metadata'].setdefault(thread_id, {})
+
+    # No new messages and a title already resolved: writing the same values
+    # back would just dirty session state and force a state diff
+    if metadata.get('message_count') == len(messages) and metadata.get('title'):
+        return
+
+    # The title is immutable once the first user message exists, so only
+    # re-scan the messages while the thread is still unnamed
+    title = metadata.get('title')
+    if not title or title == 'New Chat':
+        title = format_thread_name(thread_id, messages)
+
+    metadata.update({
         'message_count': len(messages),
-        'last_updated': datetime.now().isoformat(),
-        'title': format_thread_name(thread_id, messages)
+        'last_updated': _now_iso(),
+        'title': title
     })
 
 # **************************************** Session Setup ******************************
@@ -128,9 +311,19 @@ if 'message_history' not in st.session_state:
 if 'thread_id' not in st.session_state:
     st.session_state['thread_id'] = generate_thread_id()
 
+# Rotate idle threads into monthly archives before loading the thread list,
+# so the hot tables (and everything below) stay small
+if '_archive_rotated' not in st.session_state:
+    archive_old_threads()
+    st.session_state['_archive_rotated'] = True
+
 if 'chat_threads' not in st.session_state:
     st.session_state['chat_threads'] = retrieve_all_threads()
 
+if 'threads_by_recent' not in st.session_state:
+    # Seeded once from insertion order; maintained incrementally from here on
+    st.session_state['threads_by_recent'] = list(reversed(st.session_state['chat_threads']))
+
 if 'chat_metadata' not in st.session_state:
     st.session_state['chat_metadata'] = {}
 
@@ -151,19 +344,36 @@ if 'show_tool_details' not in st.session_state:
 
 add_thread(st.session_state['thread_id'])
 
+# Hydrate metadata once per session; reruns read from chat_metadata only.
+# One aggregated query covers every indexed thread; only threads that predate
+# the search index fall back to a per-thread checkpoint load.
+if not st.session_state.get('_metadata_hydrated'):
+    summaries = get_thread_summaries(st.session_state['chat_threads'])
+    for _tid in st.session_state['chat_threads']:
+        if _tid in summaries:
+            st.session_state['chat_metadata'].setdefault(_tid, {}).update(summaries[_tid])
+        else:
+            update_chat_metadata(_tid)
+    st.session_state['_metadata_hydrated'] = True
+
 # **************************************** Sidebar UI *********************************
 
-with st.sidebar:
+@st.fragment
+def _render_sidebar():
+    """Sidebar UI in its own fragment: interactions here rerun only this
+    block instead of the whole script (thread switches opt back into a
+    full rerun explicitly). Called from inside `with st.sidebar:` -- opening
+    st.sidebar inside a fragment raises StreamlitAPIException."""
     st.title(' AI Agent Chatbot')
     st.caption('Powered by LangGraph ')
-    
+
     # New Chat Button
     if st.button('New Chat', use_container_width=True, type='primary'):
         reset_chat()
-        st.rerun()
-    
+        st.rerun(scope='app')
+
     st.divider()
-    
+
     # Quick Actions
     col1, col2 = st.columns(2)
     with col1:
@@ -172,7 +382,7 @@ with st.sidebar:
     with col2:
         if st.button(' Settings', use_container_width=True):
             st.session_state['show_settings'] = not st.session_state.get('show_settings', False)
-    
+
     # Settings Panel
     if st.session_state.get('show_settings', False):
         with st.expander(" Agent Settings", expanded=True):
@@ -184,55 +394,67 @@ with st.sidebar:
                 step=0.1,
                 help='Higher = more creative, Lower = more focused'
             )
-            
+
             st.session_state['system_prompt'] = st.text_area(
                 'System Prompt',
                 value=st.session_state['system_prompt'],
                 placeholder='Enter custom instructions for the AI...',
                 height=100
             )
-            
+
+            # Seed the checkpoint right away; no-op unless the text changed
+            if st.session_state['system_prompt']:
+                apply_system_prompt(st.session_state['thread_id'])
+
             st.session_state['show_tool_details'] = st.checkbox(
                 'Show Tool Details',
                 value=st.session_state['show_tool_details'],
                 help='Display tool usage in chat'
             )
-            
+
             if st.button('Clear All Chats', type='secondary', use_container_width=True):
                 if st.checkbox(' Confirm deletion'):
                     st.session_state['chat_threads'] = [st.session_state['thread_id']]
                     st.session_state['chat_metadata'] = {}
                     st.success('All chats cleared!')
-                    st.rerun()
-    
+                    st.rerun(scope='app')
+
     # Available Tools
     with st.expander(" Available Tools", expanded=False):
         st.caption('The agent can use these tools automatically:')
         tools_info = get_available_tools()
-        
-        tool_categories = {
-            ' Web & Data': ['search_wikipedia', 'web_scraper', 'api_caller'],
-            ' Processing': ['calculate', 'data_processor', 'python_code_executor'],
-            ' Analysis': ['text_analyzer', 'analyze_json', 'file_analyzer', 'regex_matcher'],
-            ' Creation': ['create_chart_data'],
-            ' Utilities': ['get_current_time']
-        }
-        
-        for category, tool_names in tool_categories.items():
+
+        # One pass over tools_info via the precomputed reverse map instead
+        # of a category x tools nested scan
+        grouped = {}
+        for tool in tools_info:
+            category = TOOL_TO_CATEGORY.get(tool['name'], ' Other')
+            grouped.setdefault(category, []).append(tool)
+
+        for category in TOOL_CATEGORIES:
+            if category not in grouped:
+                continue
             st.markdown(f"**{category}**")
-            for tool in tools_info:
-                if tool['name'] in tool_names:
-                    with st.container():
-                        st.markdown(f"• `{tool['name']}`")
-                        st.caption(tool['description'])
+            for tool in grouped[category]:
+                with st.container():
+                    st.markdown(f"• `{tool['name']}`")
+                    st.caption(tool['description'])
             st.divider()
-    
+
     # Search Conversations
     st.subheader(' Search Chats')
     search_query = st.text_input('Search...', placeholder='Type to search', label_visibility='collapsed')
-    
+
     if search_query:
-        results = search_conversations(search_query)
+        # Only hit the index when the query or the archive toggle actually
+        # changed since last rerun -- both feed search_conversations
+        search_key = (search_query, st.session_state.get('include_archived', False))
+        if search_key == st.session_state.get('_last_search_key'):
+            results = st.session_state.get('_last_search_results', [])
+        else:
+            results = search_conversations(search_query)
+            st.session_state['_last_search_key'] = search_key
+            st.session_state['_last_search_results'] = results
         if results:
             st.success(f'Found {len(results)} results')
             for result in results[:5]:
@@ -242,56 +464,57 @@ with st.sidebar:
                     use_container_width=True
                 ):
                     st.session_state['thread_id'] = result['thread_id']
-                    messages = load_conversation(result['thread_id'])
-                    temp_messages = []
-                    for msg in messages:
-                        role = 'user' if isinstance(msg, HumanMessage) else 'assistant'
-                        temp_messages.append({'role': role, 'content': msg.content})
-                    st.session_state['message_history'] = temp_messages
-                    st.rerun()
+                    touch_thread(result['thread_id'])
+                    # Shallow copy: history is appended to, the cache isn't
+                    st.session_state['message_history'] = list(load_conversation_view(result['thread_id']))
+                    st.rerun(scope='app')
         else:
             st.info('No results found')
-    
+
     st.divider()
-    
+
     # My Conversations
     st.subheader(' My Conversations')
-    
+
     # Sort options
     sort_option = st.selectbox(
         'Sort by',
         ['Recent', 'Oldest', 'Most Messages'],
         label_visibility='collapsed'
     )
-    
-    # Sort threads
-    sorted_threads = st.session_state['chat_threads'].copy()
+    st.checkbox('Include archived in search', key='include_archived')
+
+    # Pick the right ordering -- 'Recent' is maintained incrementally, so no
+    # per-rerun copy or reversal; only 'Most Messages' pays for a sort
     if sort_option == 'Recent':
-        sorted_threads = sorted_threads[::-1]
+        sorted_threads = st.session_state['threads_by_recent']
     elif sort_option == 'Most Messages':
         sorted_threads = sorted(
-            sorted_threads,
+            st.session_state['chat_threads'],
             key=lambda t: st.session_state['chat_metadata'].get(t, {}).get('message_count', 0),
             reverse=True
         )
-    
-    # Display threads
+    else:  # Oldest
+        sorted_threads = st.session_state['chat_threads']
+
+    # Display threads -- paginated, so render cost is O(PAGE_SIZE) no matter
+    # how many conversations exist
     if not sorted_threads:
         st.info('No conversations yet. Start chatting!')
-    
-    for thread_id in sorted_threads:
-        messages = load_conversation(thread_id)
-        update_chat_metadata(thread_id)
-        
+
+    page = st.session_state.setdefault('thread_page', 0)
+    visible_threads = sorted_threads[:(page + 1) * PAGE_SIZE]
+
+    for thread_id in visible_threads:
         metadata = st.session_state['chat_metadata'].get(thread_id, {})
-        button_label = metadata.get('title', format_thread_name(thread_id, messages))
-        message_count = metadata.get('message_count', len(messages))
-        
+        button_label = metadata.get('title', 'New Chat')
+        message_count = metadata.get('message_count', 0)
+
         # Highlight current thread
         is_current = thread_id == st.session_state['thread_id']
-        
+
         col1, col2 = st.columns([5, 1])
-        
+
         with col1:
             if st.button(
                 f"{' ' if is_current else ''}  {button_label}",
@@ -300,36 +523,51 @@ with st.sidebar:
                 type='primary' if is_current else 'secondary'
             ):
                 st.session_state['thread_id'] = thread_id
-                temp_messages = []
-                for msg in messages:
-                    role = 'user' if isinstance(msg, HumanMessage) else 'assistant'
-                    temp_messages.append({'role': role, 'content': msg.content})
-                st.session_state['message_history'] = temp_messages
-                st.rerun()
-            
+                touch_thread(thread_id)
+                # Shallow copy: history is appended to, the cache isn't
+                st.session_state['message_history'] = list(load_conversation_view(thread_id))
+                st.rerun(scope='app')
+
             st.caption(f" {message_count} messages")
-        
+
         with col2:
             # More options
             with st.popover("⋮"):
+                # Serialize on the first click only; later reruns with the
+                # popover open reuse the stored bytes
                 if st.button("Export", key=f"export_{thread_id}", use_container_width=True):
-                    export_data = export_conversation(thread_id)
+                    st.session_state[f'_export_{thread_id}'] = export_conversation(thread_id)
+                if f'_export_{thread_id}' in st.session_state:
                     st.download_button(
                         label="Download",
-                        data=export_data,
+                        data=st.session_state[f'_export_{thread_id}'],
                         file_name=f"chat_{thread_id[:8]}.json",
                         mime="application/json",
                         key=f"download_{thread_id}"
                     )
-                
+
                 if st.button(" Delete", key=f"delete_{thread_id}", use_container_width=True):
                     if thread_id == st.session_state['thread_id']:
                         reset_chat()
                     delete_thread(thread_id)
-                    st.rerun()
-    
+                    st.rerun(scope='app')
+
+    remaining = len(sorted_threads) - len(visible_threads)
+    if remaining > 0:
+        if st.button(f'Load more ({remaining} hidden)', use_container_width=True):
+            st.session_state['thread_page'] += 1
+            st.rerun()
+
     st.divider()
-    
+
+    # Surface load failures once, here, instead of one toast per call
+    load_errors = st.session_state.get('load_errors', {})
+    if load_errors:
+        with st.expander(f"⚠ {len(load_errors)} thread(s) failed to load", expanded=False):
+            for failed_id, failure in load_errors.items():
+                st.caption(f"`{failed_id[:8]}`: {failure['error']}")
+        st.divider()
+
     # Footer
     st.caption(' **Quick Tips:**')
     st.caption('• Agent uses tools automatically')
@@ -337,6 +575,9 @@ with st.sidebar:
     st.caption('• Try: "Sort: 5, 2, 8, 1, 9"')
     st.caption('• Try: "Search Wikipedia for AI"')
 
+with st.sidebar:
+    _render_sidebar()
+
 # **************************************** Main UI ************************************
 
 # Header
@@ -365,9 +606,17 @@ for idx, message in enumerate(st.session_state['message_history']):
                     st.json(tool_args)
         
         # Show tool results if present
-        if st.session_state['show_tool_details'] and message.get('tool_result'):
+        if st.session_state['show_tool_details'] and message.get('tool_result_ref'):
             with st.expander(" Tool Results", expanded=False):
-                st.text(message['tool_result'])
+                # Only resolve the blob when its expander actually renders
+                results = st.session_state.get('tool_results_store', {}).get(message['tool_result_ref'])
+                if results is None:
+                    st.caption('Tool output no longer available')
+                elif isinstance(results, str):  # entries stored before the list change
+                    st.text(results)
+                else:
+                    for tr in results:
+                        st.text(tr)
         
         # Main message content
         st.markdown(message['content'])
@@ -408,51 +657,111 @@ if user_input:
         "run_name": "chat_turn",
     }
     
-    # Prepare messages
+    # Prepare messages -- the system prompt is checkpointed into the thread
+    # state, so each turn ships only the new user message
+    apply_system_prompt(st.session_state['thread_id'])
     messages_to_send = [HumanMessage(content=user_input)]
-    if st.session_state['system_prompt']:
-        messages_to_send.insert(0, HumanMessage(content=f"System: {st.session_state['system_prompt']}"))
+    # Threads that already had history when the prompt was set can't be
+    # seeded (Gemini drops non-leading SystemMessages), so those ship the
+    # prompt with each turn the way the pre-seeding code did
+    _prompt = st.session_state.get('system_prompt', '')
+    if _prompt and st.session_state['_system_prompt_applied'].get(st.session_state['thread_id']) != _prompt:
+        messages_to_send.insert(0, HumanMessage(content=f"System: {_prompt}"))
     
     # Stream response
     with st.chat_message('assistant'):
         try:
-            response_content = ""
-            response_placeholder = st.empty()
             tool_calls_made = []
             tool_results = []
             
             # Progress indicator
             status = st.status(" Thinking...", expanded=st.session_state['show_tool_details'])
             
-            # Stream the response
-            for event in chatbot.stream(
-                {'messages': messages_to_send},
-                config=config,
-                stream_mode='values'
-            ):
-                if 'messages' in event and len(event['messages']) > 0:
-                    last_msg = event['messages'][-1]
-                    
-                    # Track tool calls
-                    if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
-                        for tool_call in last_msg.tool_calls:
-                            tool_name = tool_call.get('name', 'unknown')
-                            tool_args = tool_call.get('args', {})
-                            tool_calls_made.append({'name': tool_name, 'args': tool_args})
-                            status.update(label=f"🔧 Using: {tool_name}", state="running")
-                    
-                    # Track tool results
-                    if isinstance(last_msg, ToolMessage):
-                        tool_results.append(last_msg.content)
-                        status.update(label=f"Got results", state="running")
-                    
-                    # Display AI response
-                    if isinstance(last_msg, AIMessage) and last_msg.content:
-                        response_content = last_msg.content
-                        status.update(label="✨ Generating response...", state="running")
-            
+            # A worker thread consumes the LangGraph stream and hands message
+            # chunks over a queue, so network waits never block the script thread
+            event_queue = queue.Queue()
+
+            def _consume_stream():
+                try:
+                    for chunk, metadata in chatbot.stream(
+                        {'messages': messages_to_send},
+                        config=config,
+                        stream_mode='messages'
+                    ):
+                        event_queue.put(('chunk', chunk))
+                except Exception as e:
+                    event_queue.put(('error', e))
+                finally:
+                    event_queue.put(('done', None))
+
+            worker = threading.Thread(target=_consume_stream, daemon=True)
+            add_script_run_ctx(worker)
+            worker.start()
+
+            # Drain the queue as a generator of token deltas; st.write_stream
+            # ships only the newly yielded fragment over the websocket instead
+            # of re-sending the whole accumulated buffer each tick. Tool calls
+            # and results are collected as side-effects on the closure lists.
+            stream_error = []
+
+            def token_iter():
+                buf = []
+                last_flush = time.monotonic()
+                done = False
+                pending_status = None
+                shown_status = None
+
+                while not done:
+                    try:
+                        kind, payload = event_queue.get(timeout=0.05)
+                    except queue.Empty:
+                        kind = None
+
+                    if kind == 'done':
+                        done = True
+                    elif kind == 'error':
+                        stream_error.append(payload)
+                        done = True
+                    elif kind == 'chunk':
+                        chunk = payload
+
+                        # Track tool calls; the label push is deferred to the
+                        # flush window so only the latest one per window hits
+                        # the DOM
+                        if hasattr(chunk, 'tool_calls') and chunk.tool_calls:
+                            for tool_call in chunk.tool_calls:
+                                tool_name = tool_call.get('name', 'unknown')
+                                tool_args = tool_call.get('args', {})
+                                tool_calls_made.append({'name': tool_name, 'args': tool_args})
+                                pending_status = f"🔧 Using: {tool_name}"
+
+                        # Track tool results
+                        if isinstance(chunk, ToolMessage):
+                            tool_results.append(chunk.content)
+                            pending_status = "Got results"
+                        elif isinstance(chunk, AIMessage) and chunk.content:
+                            buf.append(chunk.content)
+                            pending_status = "✨ Generating response..."
+
+                    # Yield at most every ~50ms: one delta and at most one
+                    # status label change per window
+                    now = time.monotonic()
+                    if now - last_flush > 0.05 or done:
+                        if buf:
+                            yield ''.join(buf)
+                            buf.clear()
+                        if pending_status is not None and pending_status != shown_status:
+                            status.update(label=pending_status, state="running")
+                            shown_status = pending_status
+                        last_flush = now
+
+            response_content = st.write_stream(token_iter()) or ""
+
+            worker.join()
+            if stream_error:
+                raise stream_error[0]
+
             status.update(label="Complete!", state="complete")
-            response_placeholder.markdown(response_content)
             
             # Save to history
             message_data = {
@@ -463,10 +772,21 @@ if user_input:
             if tool_calls_made:
                 message_data['tool_calls'] = tool_calls_made
             if tool_results:
-                message_data['tool_result'] = "\n".join(tool_results)
+                # Store the list as-is -- no join copy, and the render pass can
+                # emit each tool's output as its own element
+                message_data['tool_result_ref'] = store_tool_results(tool_results)
             
             st.session_state['message_history'].append(message_data)
+            # New turn landed in the checkpoint -- refresh this thread from the DB
+            invalidate_conversation_cache(st.session_state['thread_id'])
             update_chat_metadata(st.session_state['thread_id'])
+            touch_thread(st.session_state['thread_id'])
+            # Stored export bytes are stale now
+            st.session_state.pop(f"_export_{st.session_state['thread_id']}", None)
+
+            # Keep the full-text search index in sync with the new turn
+            index_message(st.session_state['thread_id'], 'user', user_input)
+            index_message(st.session_state['thread_id'], 'assistant', response_content)
             
             # Show success message
             if tool_calls_made: